@@ -3,10 +3,13 @@ Flask API Service
 Provide REST API for Node.js to call scam detection model
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 from predict import ScamPredictor
-import traceback
+from micro_batcher import MicroBatcher
+import orjson
+import logging
 import sys
 import io
 import os
@@ -15,7 +18,32 @@ import os
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson (much faster than stdlib json, handles numpy types)"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+# Batch size for streamed (NDJSON) batch predictions
+NDJSON_CHUNK_SIZE = 1000
+
+# Request errors go to stderr via logging (stdout prints would contend across workers)
+log_handler = logging.StreamHandler(sys.stderr)
+logger = logging.getLogger('scam_api')
+logger.addHandler(log_handler)
+logger.propagate = False
+
+# Predictor messages logged while serving (e.g. lazy GPU model load)
+predictor_logger = logging.getLogger('predict')
+predictor_logger.addHandler(log_handler)
+predictor_logger.setLevel(logging.INFO)
+predictor_logger.propagate = False
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)  # Allow cross-origin requests
 
 # Load model
@@ -27,6 +55,12 @@ except Exception as e:
     print(f"❌ Model loading failed: {e}")
     predictor = None
 
+# With threaded gunicorn workers, coalesce concurrent /predict calls into batched model calls
+batcher = None
+if predictor is not None and int(os.environ.get('GUNICORN_THREADS', 1)) > 1:
+    batcher = MicroBatcher(predictor)
+    print("✅ Micro-batching enabled for /predict")
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check"""
@@ -80,7 +114,10 @@ def predict():
             }), 400
         
         # Predict
-        result = predictor.predict(data)
+        if batcher is not None:
+            result = batcher.predict(data)
+        else:
+            result = predictor.predict(data)
         
         return jsonify({
             'success': True,
@@ -88,8 +125,7 @@ def predict():
         })
     
     except Exception as e:
-        print(f"❌ Prediction error: {e}")
-        print(traceback.format_exc())
+        logger.exception(f"❌ Prediction error: {e}")
         return jsonify({
             'success': False,
             'error': str(e)
@@ -119,6 +155,9 @@ def predict_batch():
             {...result2...}
         ]
     }
+    
+    With "Accept: application/x-ndjson" the results are streamed instead,
+    one JSON object per line, predicted in chunks of NDJSON_CHUNK_SIZE
     """
     try:
         if predictor is None:
@@ -144,6 +183,11 @@ def predict_batch():
                 'error': 'messages must be an array'
             }), 400
         
+        # Stream results as NDJSON if requested (peak memory O(chunk) instead of O(N))
+        if 'application/x-ndjson' in request.headers.get('Accept', ''):
+            return Response(stream_with_context(_stream_batch(messages)),
+                            mimetype='application/x-ndjson')
+        
         # Batch prediction
         results = predictor.predict_batch(messages)
         
@@ -154,13 +198,32 @@ def predict_batch():
         })
     
     except Exception as e:
-        print(f"❌ Batch prediction error: {e}")
-        print(traceback.format_exc())
+        logger.exception(f"❌ Batch prediction error: {e}")
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+def _stream_batch(messages):
+    """
+    Yield batch prediction results as NDJSON lines, chunk by chunk
+    The last line is always a trailer: {"done": true, "success": true, "count": n}, or
+    {"done": true, "success": false, "error": ..., "count": n} if prediction failed after
+    n results; a stream without it was truncated
+    """
+    count = 0
+    try:
+        for start in range(0, len(messages), NDJSON_CHUNK_SIZE):
+            for result in predictor.predict_batch(messages[start:start + NDJSON_CHUNK_SIZE]):
+                yield orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY) + b'\n'
+                count += 1
+    except Exception as e:
+        # Headers (200) are already sent, so the failure is reported in the trailer line
+        logger.exception(f"❌ Streaming batch prediction error: {e}")
+        yield orjson.dumps({'done': True, 'success': False, 'error': str(e), 'count': count}) + b'\n'
+        return
+    yield orjson.dumps({'done': True, 'success': True, 'count': count}) + b'\n'
+
 @app.route('/model/info', methods=['GET'])
 def model_info():
     """Get model information"""
@@ -186,6 +249,7 @@ def model_info():
         }), 500
 
 if __name__ == '__main__':
+    # Development server only - use ./start.sh (gunicorn) in production
     # Get port from environment variable (for Railway, Render, etc.)
     port = int(os.environ.get('PORT', 5000))
     
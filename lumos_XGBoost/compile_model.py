@@ -0,0 +1,33 @@
+"""
+Compile Trained Model to Native Code
+Use Treelite/TL2cgen to turn the XGBoost trees into a shared library for fast scoring
+"""
+
+import os
+import sys
+import joblib
+import xgboost as xgb
+import treelite
+import tl2cgen
+
+def compile_model(model_path='scam_detector_model.pkl', toolchain='gcc'):
+    """Compile the trained XGBoost model into a shared library next to the model bundle"""
+    print("📦 Loading model...")
+    model_data = joblib.load(model_path)
+    if 'model' in model_data:
+        booster = model_data['model'].get_booster()
+    else:
+        booster = xgb.Booster()
+        booster.load_model(os.path.join(os.path.dirname(os.path.abspath(model_path)),
+                                        model_data['booster_path']))
+    
+    print("🔧 Compiling trees to native code...")
+    model = treelite.frontend.from_xgboost(booster)
+    libpath = os.path.splitext(model_path)[0] + '.so'
+    tl2cgen.export_lib(model, toolchain=toolchain, libpath=libpath,
+                       params={'parallel_comp': os.cpu_count() or 1})
+    print(f"✅ Compiled model saved: {libpath}")
+    return libpath
+
+if __name__ == "__main__":
+    compile_model(*sys.argv[1:2])
@@ -0,0 +1,22 @@
+"""
+Gunicorn configuration for the scam detection API
+XGBoost inference takes well under 1ms per message, so serving overhead dominates.
+Many single-threaded worker processes scale far better than threads here.
+"""
+
+import multiprocessing
+import os
+
+# Keep each worker's XGBoost/OpenMP pool to one thread so workers don't oversubscribe cores
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# Set GUNICORN_THREADS > 1 to use threaded workers; api_server then coalesces
+# concurrent /predict calls into batched model calls (see micro_batcher.py)
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = 30
+
+# Load the model once in the master and share it copy-on-write with the forked workers
+preload_app = True
@@ -0,0 +1,65 @@
+"""
+Micro-batching for concurrent single predictions
+Coalesce requests that arrive within a few milliseconds into one batched model call
+"""
+
+import queue
+import threading
+from concurrent.futures import Future
+
+class MicroBatcher:
+    def __init__(self, predictor, max_batch_size=32, max_wait=0.002):
+        """
+        predictor: ScamPredictor used for the batched calls
+        max_batch_size: maximum number of requests coalesced into one model call
+        max_wait: seconds to wait for more requests after the first one arrives
+        """
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+    
+    def predict(self, message_data):
+        """Predict a single message, batched together with concurrent callers"""
+        # Normalize up front, exactly as predictor.predict would, so batched results match
+        # single predictions and malformed values are handled in the caller's thread
+        message = self.predictor.normalize_message(message_data)
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((message, future))
+        return future.result()
+    
+    def _ensure_worker(self):
+        """Start the worker thread on first use (after gunicorn has forked the worker process)"""
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, daemon=True)
+                    self._worker.start()
+    
+    def _run(self):
+        """Worker loop: drain up to max_batch_size requests or until max_wait expires"""
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.max_batch_size:
+                    batch.append(self._queue.get(timeout=self.max_wait))
+            except queue.Empty:
+                pass
+            
+            messages = [message for message, _ in batch]
+            try:
+                # Cached messages are answered directly; misses share one model call
+                results = self.predictor.predict_many(messages)
+            except Exception:
+                # Retry one by one so a bad request fails alone, not with its neighbours
+                for message, future in batch:
+                    try:
+                        future.set_result(self.predictor.predict(message))
+                    except Exception as e:
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
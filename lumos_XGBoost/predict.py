@@ -3,58 +3,407 @@ Scam SMS Prediction Script
 Load trained model for prediction
 """
 
+import os
+import logging
+import threading
+from collections import OrderedDict
 import joblib
 import pandas as pd
 import numpy as np
+import xgboost as xgb
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
 
+try:
+    import tl2cgen  # Optional: runtime for models compiled with compile_model.py
+except ImportError:
+    tl2cgen = None
+
+try:
+    import cupy  # Optional: GPU batch inference with RAPIDS FIL
+    from cuml import ForestInference
+except ImportError:
+    cupy = None
+    ForestInference = None
+
+try:
+    from numba import njit  # Optional: JIT-compiled single-row scaling + ranking
+except ImportError:
+    njit = None
+
+# Messages from code that runs while serving requests (never print on the request path)
+logger = logging.getLogger(__name__)
+
+# Batches at least this large are scored on the GPU (smaller ones are dominated by PCIe transfer)
+GPU_BATCH_THRESHOLD = 1000
+
+# Text fields read when the model uses text features
+TEXT_COLUMNS = ['message_text', 'openai_reason', 'openai_keywords', 'openai_emotion_triggers',
+                'openai_action_requested', 'openai_impersonation_type']
+
+# One-hot categories for text-derived features (must match training)
+COMMON_ACTIONS = ['click_link', 'reply', 'call_number', 'provide_info']
+COMMON_IMPERSONATIONS = ['company', 'bank', 'government', 'courier']
+
+# Number of top contributing features reported per prediction
+TOP_K = 5
+
+def _to_float(value):
+    """Convert a raw feature value to float, treating missing/non-numeric values as 0"""
+    try:
+        result = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if np.isnan(result) else result
+
+def _to_text(value):
+    """Convert a raw text field to str, treating missing values as empty"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ''
+    return str(value)
+
+def _count_items(series):
+    """Number of comma-separated items per row (0 for blank values)"""
+    text = series.astype(str)
+    return (text.str.count(',') + 1).where(text.str.strip() != '', 0)
+
+def _count_items_text(text):
+    """Number of comma-separated items in a single string (0 if blank)"""
+    return text.count(',') + 1 if text.strip() else 0
+
+def _feature_importances(booster):
+    """
+    Normalized gain importances per feature, bit-identical to XGBClassifier.feature_importances_
+    (normalized in float32) so contribution scores and their ranking match the original output
+    """
+    score = booster.get_score(importance_type='gain')
+    names = booster.feature_names or [f'f{i}' for i in range(booster.num_features())]
+    importances = np.array([score.get(name, 0.0) for name in names], dtype=np.float32)
+    total = importances.sum()
+    if total > 0:
+        importances = importances / total
+    return importances.astype(np.float64)
+
+def _to_dense(X, missing=0.0):
+    """Densify a sparse matrix, filling absent entries with `missing`"""
+    X = X.tocoo()
+    dense = np.full(X.shape, missing, dtype=np.float32)
+    dense[X.row, X.col] = X.data
+    return dense
+
+def _dense_row(X, i):
+    """Row i of a dense or sparse feature matrix as a 1D array"""
+    if sparse.issparse(X):
+        return X[i].toarray()[0]
+    return X[i]
+
+def _scale_and_rank_loops(values, mean, std, importances, k):
+    """
+    Standardize one feature row and select its top-k contributions in a single pass
+    Contribution = importance * raw value, over positive values only.
+    Returns: (scaled row as float32, top-k column indices ordered by contribution)
+    """
+    n = values.shape[0]
+    x_scaled = np.empty(n, dtype=np.float32)
+    top_idx = np.full(k, -1, dtype=np.int64)
+    top_val = np.full(k, -1.0)  # contributions are >= 0, so -1 marks an empty slot
+    for i in range(n):
+        value = values[i]
+        # Divide rather than multiply by 1/std, so the row matches StandardScaler.transform
+        x_scaled[i] = (value - mean[i]) / std[i]
+        if value > 0:
+            contribution = importances[i] * value
+            # Insert into the sorted top-k (strict > keeps earlier columns first on ties)
+            j = k - 1
+            if contribution > top_val[j]:
+                while j > 0 and contribution > top_val[j - 1]:
+                    top_val[j] = top_val[j - 1]
+                    top_idx[j] = top_idx[j - 1]
+                    j -= 1
+                top_val[j] = contribution
+                top_idx[j] = i
+    count = 0
+    while count < k and top_idx[count] >= 0:
+        count += 1
+    return x_scaled, top_idx[:count]
+
+def _scale_and_rank_numpy(values, mean, std, importances, k):
+    """NumPy equivalent of _scale_and_rank_loops, used when numba is not installed"""
+    x_scaled = ((values - mean) / std).astype(np.float32)
+    contributions = importances * values
+    # Only consider non-zero features; a stable sort keeps earlier columns first on ties
+    # (argpartition would pick an arbitrary subset of tied candidates)
+    candidates = np.flatnonzero(values > 0)
+    return x_scaled, candidates[np.argsort(-contributions[candidates], kind='stable')[:k]]
+
+if njit is not None:
+    _scale_and_rank = njit(cache=True)(_scale_and_rank_loops)
+else:
+    _scale_and_rank = _scale_and_rank_numpy
+
+def _copy_result(result):
+    """Copy of a prediction result, so callers can't mutate a cached one"""
+    return dict(result, top_scam_factors=[dict(f) for f in result['top_scam_factors']])
+
+class _PredictionCache:
+    """Thread-safe LRU map from a normalized message key to its prediction result"""
+    
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Cached result for key, or None"""
+        with self._lock:
+            result = self._data.get(key)
+            if result is not None:
+                self._data.move_to_end(key)
+            return result
+    
+    def put(self, key, result):
+        """Store a result, evicting the least recently used one when full"""
+        with self._lock:
+            self._data[key] = result
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
 class ScamPredictor:
-    def __init__(self, model_path='scam_detector_model.pkl'):
-        """Load model"""
+    def __init__(self, model_path='scam_detector_model.pkl', cache_size=10000, use_gpu=True):
+        """
+        Load model
+        cache_size: number of recent predictions to cache (0 disables the cache)
+        use_gpu: score large batches with RAPIDS FIL when a CUDA device is available
+        """
         print("📦 Loading model...")
         model_data = joblib.load(model_path)
-        self.model = model_data['model']
-        self.scaler = model_data['scaler']
+        if 'model' in model_data:
+            # Legacy bundle with the pickled XGBoost model
+            self.booster = model_data['model'].get_booster()
+        else:
+            # Native UBJSON booster saved next to the bundle, loaded straight into a
+            # Booster (no pickle round trip, no sklearn wrapper)
+            booster_path = os.path.join(os.path.dirname(os.path.abspath(model_path)),
+                                        model_data['booster_path'])
+            self.booster = xgb.Booster()
+            self.booster.load_model(booster_path)
+        self.compiled_predictor = self._load_compiled_model(model_path, model_data)
+        # The GPU model is loaded on first use: CUDA must not be initialized before
+        # gunicorn forks its workers (preload_app)
+        self.gpu_model = None
+        self._gpu_source = (model_path, model_data) if use_gpu else None
+        self._gpu_lock = threading.Lock()
+        self.scaler = model_data.get('scaler')
         self.tfidf_vectorizer = model_data.get('tfidf_vectorizer')
         self.keyword_vectorizer = model_data.get('keyword_vectorizer')
         self.feature_columns = model_data['feature_columns']
         self.use_text_features = model_data.get('use_text_features', False)
+        self.text_features_active = self.use_text_features and self.tfidf_vectorizer is not None
+        # Whether the model was trained on sparse input (absent entries = missing)
+        self.sparse_input = model_data.get('sparse_features', False)
+        # Tree ensembles are invariant to per-feature scaling, so the scaler is only
+        # applied when the model was actually trained on standardized features
+        self.needs_scaling = self.scaler is not None
+        # Feature importances, used to rank contributing features per prediction
+        self._importances = _feature_importances(self.booster)
+        # Scaler parameters for the fused single-row path (identity when not scaling)
+        n_features = len(self.feature_columns)
+        self._identity_mean = np.zeros(n_features)
+        self._identity_std = np.ones(n_features)
+        self._mean, self._std = self._identity_mean, self._identity_std
+        if self.needs_scaling:
+            if self.scaler.with_mean:
+                self._mean = np.asarray(self.scaler.mean_, dtype=np.float64)
+            if self.scaler.with_std:
+                self._std = np.asarray(self.scaler.scale_, dtype=np.float64)
+        self._init_column_layout()
+        # Per-thread feature buffers reused across single-message predictions
+        self._local = threading.local()
+        # LRU cache of full predictions, keyed by the normalized request content
+        self._cache = _PredictionCache(cache_size) if cache_size > 0 else None
+        # Compile the numba kernel now (same argument types as serving), so the gunicorn
+        # master pays the JIT cost once instead of every worker on its first request
+        _scale_and_rank(np.zeros(n_features), self._mean, self._std, self._importances, TOP_K)
         print(f"✅ Model loaded successfully (features: {len(self.feature_columns)})")
         if self.use_text_features:
             print(f"   Text features enabled: TF-IDF vectorizers loaded")
     
+    def _load_compiled_model(self, model_path, model_data):
+        """Load the native library built by compile_model.py, if present and up to date"""
+        libpath = os.path.splitext(model_path)[0] + '.so'
+        if tl2cgen is None or not os.path.exists(libpath):
+            return None
+        
+        # Ignore a library compiled from an older model
+        source_path = model_path
+        if 'booster_path' in model_data:
+            source_path = os.path.join(os.path.dirname(os.path.abspath(model_path)),
+                                       model_data['booster_path'])
+        if os.path.getmtime(libpath) < os.path.getmtime(source_path):
+            print(f"   Ignoring stale compiled model: {libpath}")
+            return None
+        
+        print(f"   Compiled model loaded: {libpath}")
+        return tl2cgen.Predictor(libpath, nthread=1)
+    
+    def _load_gpu_model(self, model_path, model_data):
+        """Load the model into RAPIDS FIL for GPU batch inference, if a CUDA device is available"""
+        if ForestInference is None or 'booster_path' not in model_data:
+            return None
+        try:
+            if cupy.cuda.runtime.getDeviceCount() == 0:
+                return None
+            booster_path = os.path.join(os.path.dirname(os.path.abspath(model_path)),
+                                        model_data['booster_path'])
+            gpu_model = ForestInference.load(booster_path, model_type='xgboost_ubj', output_class=True)
+        except Exception as e:
+            logger.warning(f"GPU inference unavailable, using CPU: {e}")
+            return None
+        logger.info("GPU batch inference enabled (RAPIDS FIL)")
+        return gpu_model
+    
+    def _get_gpu_model(self):
+        """Load the GPU model on first call, then return it (None if unavailable)"""
+        if self._gpu_source is not None:
+            with self._gpu_lock:
+                if self._gpu_source is not None:
+                    self.gpu_model = self._load_gpu_model(*self._gpu_source)
+                    self._gpu_source = None
+        return self.gpu_model
+    
+    def _init_column_layout(self):
+        """
+        Precompute the feature column layout
+        Features are assembled as [dense columns | TF-IDF columns] and then
+        reordered to the training column order with a single gather
+        The vectorizers are exercised here once, so a broken bundle fails at startup
+        instead of on every request
+        """
+        self._text_columns = []
+        self._n_tfidf_msg = self._n_tfidf_kw = 0
+        if self.text_features_active:
+            self._n_tfidf_msg = self.tfidf_vectorizer.transform(['']).shape[1]
+            self._text_columns += [f'tfidf_msg_{i}' for i in range(self._n_tfidf_msg)]
+            if self.keyword_vectorizer is not None:
+                self._n_tfidf_kw = self.keyword_vectorizer.transform(['']).shape[1]
+                self._text_columns += [f'tfidf_kw_{i}' for i in range(self._n_tfidf_kw)]
+        
+        text_columns = set(self._text_columns)
+        self._dense_columns = [col for col in self.feature_columns if col not in text_columns]
+        # Column name -> position map for filling feature vectors without pandas
+        self._dense_index = {col: i for i, col in enumerate(self._dense_columns)}
+        position = {col: i for i, col in enumerate(self._dense_columns + self._text_columns)}
+        self._column_order = np.array([position[col] for col in self.feature_columns])
+    
     def prepare_features(self, message_data):
         """
         Prepare features for prediction
         message_data: dict containing all feature columns (including text fields)
+        Returns: 2D array of shape (1, n_features), sparse CSR for models trained on sparse input
+        """
+        row = np.zeros(len(self._dense_columns) + len(self._text_columns))
+        X = np.zeros((1, len(self.feature_columns)))
+        return self._assemble_features(message_data, row, X)
+    
+    def _thread_buffers(self):
+        """Reusable (row, X) buffers owned by the calling thread"""
+        local = self._local
+        if not hasattr(local, 'row'):
+            local.row = np.zeros(len(self._dense_columns) + len(self._text_columns))
+            local.X = np.zeros((1, len(self.feature_columns)))
+        return local.row, local.X
+    
+    def _assemble_features(self, message_data, row, X):
         """
-        # Create DataFrame
-        df = pd.DataFrame([message_data])
+        Fill the feature vector for one message into the given buffers
+        row: assembly buffer in [dense | TF-IDF] layout, X: (1, n_features) output
+        """
+        # Fill a vector directly from the dict, no pandas involved
+        row.fill(0)
+        for key, value in message_data.items():
+            idx = self._dense_index.get(key)
+            if idx is not None:
+                row[idx] = _to_float(value)
         
-        # Extract text features if model was trained with them
-        if self.use_text_features and self.tfidf_vectorizer is not None:
-            df = self._extract_text_features(df)
+        if self.text_features_active:
+            self._fill_text_features(message_data, row)
+        
+        # Restore the training column order
+        np.take(row, self._column_order, out=X[0])
+        return sparse.csr_matrix(X) if self.sparse_input else X
+    
+    def _fill_text_features(self, message_data, row):
+        """Single-message version of _extract_text_features, writing into row in place"""
+        text = {col: _to_text(message_data.get(col)) for col in TEXT_COLUMNS}
+        
+        # Derived numeric features
+        derived = {
+            'keyword_count': _count_items_text(text['openai_keywords']),
+            'reason_length': len(text['openai_reason']),
+            'emotion_trigger_count': _count_items_text(text['openai_emotion_triggers'])
+        }
+        action = text['openai_action_requested'].lower()
+        for a in COMMON_ACTIONS:
+            derived[f'action_{a}'] = int(action == a)
+        imp_type = text['openai_impersonation_type'].lower()
+        for t in COMMON_IMPERSONATIONS:
+            derived[f'impersonate_{t}'] = int(imp_type == t)
+        for col, value in derived.items():
+            idx = self._dense_index.get(col)
+            if idx is not None:
+                row[idx] = value
+        
+        # TF-IDF blocks follow the dense columns
+        start = len(self._dense_columns)
+        tfidf_matrix = self.tfidf_vectorizer.transform([text['message_text']])
+        row[start:start + self._n_tfidf_msg] = tfidf_matrix.toarray()[0]
         
-        # Ensure all feature columns exist
-        for col in self.feature_columns:
-            if col not in df.columns:
-                df[col] = 0
+        if self.keyword_vectorizer is not None:
+            start += self._n_tfidf_msg
+            keyword_tfidf_matrix = self.keyword_vectorizer.transform([text['openai_keywords']])
+            row[start:start + self._n_tfidf_kw] = keyword_tfidf_matrix.toarray()[0]
+    
+    def prepare_features_batch(self, messages_data):
+        """
+        Prepare features for batch prediction
+        messages_data: list of dicts containing all feature columns (including text fields)
+        Returns: 2D array of shape (n_messages, n_features), sparse CSR when text features are used
+        """
+        # Build a single DataFrame for the whole batch
+        df = pd.DataFrame(messages_data)
+        return self._select_features(df)
+    
+    def _select_features(self, df):
+        """Extract text features and align columns with the training feature order"""
+        # Extract text features if model was trained with them
+        text_block = None
+        columns = self.feature_columns
+        if self.text_features_active:
+            df, text_block = self._extract_text_features(df)
+            columns = self._dense_columns
         
-        # Keep only required features
-        X = df[self.feature_columns].fillna(0)
+        # Keep only required features (missing columns are filled with 0)
+        X = df.reindex(columns=columns).fillna(0)
         
         # Handle data types
         for col in X.columns:
-            if X[col].dtype == 'object':
-                try:
-                    X[col] = pd.to_numeric(X[col], errors='coerce').fillna(0)
-                except:
-                    X[col] = 0
+            if not pd.api.types.is_numeric_dtype(X[col]):
+                X[col] = pd.to_numeric(X[col], errors='coerce').fillna(0)
+        X = X.to_numpy(dtype=np.float64)
         
-        return X
+        if text_block is None:
+            return X
+        
+        # Keep the TF-IDF block sparse and restore the training column order
+        X = sparse.hstack([sparse.csr_matrix(X), text_block], format='csr')
+        return X[:, self._column_order]
     
     def _extract_text_features(self, df):
-        """Extract text features during prediction (mirrors training process)"""
+        """
+        Extract text features during prediction (mirrors training process)
+        Returns: (df with derived numeric columns, sparse TF-IDF block in self._text_columns order)
+        """
         
         # Fill missing text - ensure columns exist first
         if 'message_text' not in df.columns:
@@ -70,88 +419,107 @@ class ScamPredictor:
         if 'openai_impersonation_type' not in df.columns:
             df['openai_impersonation_type'] = ''
         
-        # Fill NaN values
-        df['message_text'] = df['message_text'].fillna('')
-        df['openai_reason'] = df['openai_reason'].fillna('')
-        df['openai_keywords'] = df['openai_keywords'].fillna('')
-        df['openai_emotion_triggers'] = df['openai_emotion_triggers'].fillna('')
-        df['openai_action_requested'] = df['openai_action_requested'].fillna('')
-        df['openai_impersonation_type'] = df['openai_impersonation_type'].fillna('')
-        
-        # 1. TF-IDF from message_text
-        if self.tfidf_vectorizer is not None:
-            try:
-                tfidf_matrix = self.tfidf_vectorizer.transform(df['message_text'])
-                tfidf_features = pd.DataFrame(
-                    tfidf_matrix.toarray(),
-                    columns=[f'tfidf_msg_{i}' for i in range(tfidf_matrix.shape[1])],
-                    index=df.index
-                )
-                df = pd.concat([df, tfidf_features], axis=1)
-            except Exception as e:
-                print(f"Warning: TF-IDF transform failed: {e}")
+        # Fill NaN values; non-string values (e.g. a numeric message_text) become their
+        # str() form, as in the single-message path
+        for col in TEXT_COLUMNS:
+            df[col] = df[col].fillna('').astype(str)
+        
+        # 1. TF-IDF from message_text (kept sparse, most entries are zero)
+        tfidf_matrix = self.tfidf_vectorizer.transform(df['message_text'])
+        text_blocks = [tfidf_matrix]
         
         # 2. TF-IDF from openai_keywords
         if self.keyword_vectorizer is not None:
-            try:
-                keyword_tfidf_matrix = self.keyword_vectorizer.transform(df['openai_keywords'])
-                keyword_tfidf_features = pd.DataFrame(
-                    keyword_tfidf_matrix.toarray(),
-                    columns=[f'tfidf_kw_{i}' for i in range(keyword_tfidf_matrix.shape[1])],
-                    index=df.index
-                )
-                df = pd.concat([df, keyword_tfidf_features], axis=1)
-            except Exception as e:
-                print(f"Warning: Keyword TF-IDF transform failed: {e}")
+            keyword_tfidf_matrix = self.keyword_vectorizer.transform(df['openai_keywords'])
+            text_blocks.append(keyword_tfidf_matrix)
         
         # 3. Keyword count
-        df['keyword_count'] = df['openai_keywords'].apply(
-            lambda x: len(str(x).split(',')) if pd.notna(x) and str(x).strip() else 0
-        )
+        df['keyword_count'] = _count_items(df['openai_keywords'])
         
         # 4. Reason length
-        df['reason_length'] = df['openai_reason'].apply(
-            lambda x: len(str(x)) if pd.notna(x) else 0
-        )
+        df['reason_length'] = df['openai_reason'].astype(str).str.len()
         
         # 5. Emotion trigger count
-        df['emotion_trigger_count'] = df['openai_emotion_triggers'].apply(
-            lambda x: len(str(x).split(',')) if pd.notna(x) and str(x).strip() else 0
-        )
+        df['emotion_trigger_count'] = _count_items(df['openai_emotion_triggers'])
         
         # 6. Action type one-hot encoding
-        common_actions = ['click_link', 'reply', 'call_number', 'provide_info']
-        for action in common_actions:
-            df[f'action_{action}'] = df['openai_action_requested'].apply(
-                lambda x: 1 if str(x).lower() == action else 0
-            )
+        actions_lower = df['openai_action_requested'].astype(str).str.lower()
+        for action in COMMON_ACTIONS:
+            df[f'action_{action}'] = (actions_lower == action).astype(np.int8)
         
         # 7. Impersonation type one-hot encoding
-        common_impersonations = ['company', 'bank', 'government', 'courier']
-        for imp_type in common_impersonations:
-            df[f'impersonate_{imp_type}'] = df['openai_impersonation_type'].apply(
-                lambda x: 1 if str(x).lower() == imp_type else 0
-            )
+        impersonations_lower = df['openai_impersonation_type'].astype(str).str.lower()
+        for imp_type in COMMON_IMPERSONATIONS:
+            df[f'impersonate_{imp_type}'] = (impersonations_lower == imp_type).astype(np.int8)
         
-        return df
+        return df, sparse.hstack(text_blocks, format='csr')
     
     def predict(self, message_data):
         """
         Predict single message
         Returns: dict with prediction results and top contributing features
+        Repeated identical messages (e.g. the same spam blast) are served from the cache
+        """
+        message = self.normalize_message(message_data)
+        if self._cache is None:
+            return self._predict_uncached(message)
+        key = tuple(sorted(message.items()))
+        result = self._cache.get(key)
+        if result is None:
+            result = self._predict_uncached(message)
+            self._cache.put(key, result)
+        return _copy_result(result)
+    
+    def normalize_message(self, message_data):
         """
-        # Prepare features
-        X = self.prepare_features(message_data)
+        Reduce a message to the fields the model reads, converted exactly as the
+        single-message path converts them (numbers via _to_float, text via _to_text)
+        Normalized messages predict identically on the single and batch paths and are hashable
+        """
+        message = {key: _to_float(value) for key, value in message_data.items()
+                   if key in self._dense_index}
+        if self.text_features_active:
+            for col in TEXT_COLUMNS:
+                message[col] = _to_text(message_data.get(col))
+        return message
+    
+    def predict_many(self, messages):
+        """
+        Predict normalized messages (see normalize_message): cached results are reused
+        and only the misses go through one batched model call
+        """
+        keys = [tuple(sorted(message.items())) for message in messages]
+        results = [self._cache.get(key) if self._cache is not None else None for key in keys]
+        misses = [i for i, result in enumerate(results) if result is None]
+        if misses:
+            computed = self.predict_batch([messages[i] for i in misses])
+            for i, result in zip(misses, computed):
+                results[i] = result
+                if self._cache is not None:
+                    self._cache.put(keys[i], result)
+        return [_copy_result(result) for result in results]
+    
+    def _predict_uncached(self, message_data):
+        """Run the full feature + model pipeline for a single message"""
+        # Prepare features in this thread's reusable buffers
+        X = self._assemble_features(message_data, *self._thread_buffers())
         
-        # Standardize
-        X_scaled = self.scaler.transform(X)
+        # Standardize and rank the top 5 contributing features in one fused pass
+        feature_values = _dense_row(X, 0)
+        x_scaled, top_idx = _scale_and_rank(feature_values, self._mean, self._std,
+                                            self._importances, TOP_K)
+        if not self.needs_scaling:
+            X_scaled = X
+        elif sparse.issparse(X):
+            X_scaled = self._scale(X)
+        else:
+            X_scaled = x_scaled.reshape(1, -1)
         
-        # Predict
-        prediction = self.model.predict(X_scaled)[0]
-        probability = self.model.predict_proba(X_scaled)[0]
+        # Predict (single pass over the tree ensemble)
+        scam_prob = float(self._predict_scam_proba(X_scaled)[0])
+        prediction = int(scam_prob > 0.5)
         
         # Determine confidence level
-        scam_prob = probability[1]
         if scam_prob >= 0.8:
             confidence = "High"
         elif scam_prob >= 0.6:
@@ -160,54 +528,108 @@ class ScamPredictor:
             confidence = "Low"
         
         # Get top 5 features supporting scam prediction
-        top_features = self._get_top_features(X, prediction)
+        top_features = self._get_top_features(feature_values, top_idx)
         
         return {
             'is_scam': bool(prediction == 1),
-            'scam_probability': float(scam_prob),
-            'normal_probability': float(probability[0]),
+            'scam_probability': scam_prob,
+            'normal_probability': 1.0 - scam_prob,
             'confidence': confidence,
             'prediction_label': 'Scam' if prediction == 1 else 'Normal',
             'top_scam_factors': top_features
         }
     
-    def _get_top_features(self, X, prediction):
+    def _scale(self, X):
+        """
+        Apply the training scaler, or pass features through unchanged for unscaled models
+        Output is float32, XGBoost's native inference dtype
+        """
+        if self.needs_scaling:
+            if sparse.issparse(X) and not self.sparse_input:
+                X = X.toarray()
+            return self.scaler.transform(X).astype(np.float32, copy=False)
+        return X
+    
+    def _predict_scam_proba(self, X_scaled):
+        """
+        Scam probability for each row
+        Uses the compiled native model when available, otherwise booster.inplace_predict
+        so the trees are traversed once without building a DMatrix
+        """
+        if sparse.issparse(X_scaled) and self.sparse_input:
+            X_scaled = X_scaled.astype(np.float32, copy=False)
+        else:
+            # XGBoost treats absent sparse entries as missing rather than 0, so models
+            # trained on dense features are also scored on dense input
+            if sparse.issparse(X_scaled):
+                X_scaled = X_scaled.toarray()
+            X_scaled = np.ascontiguousarray(X_scaled, dtype=np.float32)
+        if self.compiled_predictor is not None:
+            if sparse.issparse(X_scaled):
+                # tl2cgen cannot read CSR input; absent entries stay missing as NaN
+                X_scaled = _to_dense(X_scaled, missing=np.nan)
+            return self.compiled_predictor.predict(tl2cgen.DMatrix(X_scaled)).reshape(-1)
+        return self.booster.inplace_predict(X_scaled)
+    
+    def _predict_scam_proba_gpu(self, X_scaled):
+        """Scam probability for each row, computed on the GPU with FIL"""
+        if sparse.issparse(X_scaled):
+            X_scaled = _to_dense(X_scaled, missing=np.nan if self.sparse_input else 0.0)
+        X_gpu = cupy.asarray(X_scaled, dtype=np.float32)
+        probabilities = self.gpu_model.predict_proba(X_gpu)
+        return cupy.asnumpy(cupy.asarray(probabilities)[:, 1])
+    
+    def _get_top_features(self, feature_values, top_idx=None):
         """
         Get top 5 features contributing to scam prediction
+        feature_values: 1D array of (unscaled) feature values for one message
+        top_idx: precomputed top feature indices (computed here if not given)
         """
-        try:
-            # Get feature importances from model
-            feature_importances = self.model.feature_importances_
-            
-            # Get feature values for this instance
-            feature_values = X.values[0]
-            
-            # Calculate contribution score (importance * value)
-            contributions = []
-            for i, (feat_name, importance, value) in enumerate(zip(self.feature_columns, feature_importances, feature_values)):
-                if value > 0:  # Only consider non-zero features
-                    contributions.append({
-                        'feature': feat_name,
-                        'value': float(value),
-                        'importance': float(importance),
-                        'contribution_score': float(importance * value)
-                    })
-            
-            # Sort by contribution score and get top 5
-            contributions.sort(key=lambda x: x['contribution_score'], reverse=True)
-            top_5 = contributions[:5]
-            
-            return top_5
-        except Exception as e:
-            print(f"Warning: Could not calculate top features: {e}")
-            return []
+        if top_idx is None:
+            _, top_idx = _scale_and_rank(feature_values, self._identity_mean,
+                                         self._identity_std, self._importances, TOP_K)
+        
+        return [{
+            'feature': self.feature_columns[i],
+            'value': float(feature_values[i]),
+            'importance': float(self._importances[i]),
+            'contribution_score': float(self._importances[i] * feature_values[i])
+        } for i in top_idx]
     
     def predict_batch(self, messages_data):
-        """Batch prediction"""
+        """
+        Batch prediction
+        Runs feature preparation, scaling and the model once for the whole batch
+        """
+        if len(messages_data) == 0:
+            return []
+        
+        # Prepare features and standardize in one pass
+        X = self.prepare_features_batch(messages_data)
+        X_scaled = self._scale(X)
+        
+        # Predict all rows with a single model call (on the GPU for large batches)
+        if X.shape[0] >= GPU_BATCH_THRESHOLD and self._get_gpu_model() is not None:
+            scam_probs = self._predict_scam_proba_gpu(X_scaled)
+        else:
+            scam_probs = self._predict_scam_proba(X_scaled)
+        predictions = (scam_probs > 0.5).astype(int)
+        confidences = np.select(
+            [scam_probs >= 0.8, scam_probs >= 0.6], ['High', 'Medium'], 'Low'
+        )
+        
+        # Build result dicts
         results = []
-        for msg_data in messages_data:
-            result = self.predict(msg_data)
-            results.append(result)
+        for i in range(X.shape[0]):
+            prediction = predictions[i]
+            results.append({
+                'is_scam': bool(prediction == 1),
+                'scam_probability': float(scam_probs[i]),
+                'normal_probability': 1.0 - float(scam_probs[i]),
+                'confidence': str(confidences[i]),
+                'prediction_label': 'Scam' if prediction == 1 else 'Normal',
+                'top_scam_factors': self._get_top_features(_dense_row(X, i))
+            })
         return results
 
 def demo():
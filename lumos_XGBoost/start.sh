@@ -0,0 +1,6 @@
+#!/bin/sh
+# Start the scam detection API with gunicorn (production)
+# OMP_NUM_THREADS must be set before XGBoost is imported
+export OMP_NUM_THREADS=1
+cd "$(dirname "$0")"
+exec gunicorn -c gunicorn_conf.py api_server:app